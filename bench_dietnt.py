@@ -0,0 +1,236 @@
+'''Benchmarks for dietnt. Run python3 bench_dietnt.py to time every function on a standard corpus of inputs and compare against the saved baseline.
+
+Each benchmark reports the best time per call over several repeats and the peak memory allocated during one call. Use --save to write the results as the baseline (bench_baseline.json by default). Without --save, the run requires a baseline and fails if any benchmark is slower or uses more memory than the baseline by more than the threshold fraction; benchmarks missing from the baseline are listed with a warning.
+'''
+
+import argparse, gc, json, os, sys, time, tracemalloc
+
+import dietnt
+from dietnt import *
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+# Peak memory differences smaller than this many bytes are never reported as regressions
+MEMORY_SLACK = 4096
+
+
+def _batch(n, bound, seed=12345):
+    '''Returns a deterministic list of n pseudorandom integers in [0, bound).'''
+    values = []
+    x = seed
+    for i in range(n):
+        x = (6364136223846793005*x + 1442695040888963407) % 2**64
+        values.append(x % bound)
+    return values
+
+
+_bases = _batch(10000, 2**31)
+_exps = _batch(10000, 2**31, 54321)
+
+# Each entry is (function name, input description, callable, arguments)
+CORPUS = [
+    ('carmichael', 'smooth 720720', carmichael, (720720,)),
+    ('carmichael', 'prime 1e9+7', carmichael, (1000000007,)),
+    ('chinese_remainder', '3 small moduli', chinese_remainder, ((2, 3, 4), (11, 13, 17))),
+    ('chinese_remainder', '3 large moduli', chinese_remainder, ((1, 2, 3), (12341234567, 750000057, 1099511627776))),
+    ('dirichlet_product', 'mu*id at 720720', dirichlet_product(mobius, lambda n: n), (720720,)),
+    ('discrete_log', 'prime 1e6+3', discrete_log, (2, 9, 1000003)),
+    ('discrete_log', 'prime 1e9+7', discrete_log, (3, 7, 1000000007)),
+    ('divisor_count', 'smooth 720720', divisor_count, (720720,)),
+    ('divisor_sigma', 'smooth 720720, k=2', divisor_sigma, (720720, 2)),
+    ('divisors', 'smooth 720720 sorted', lambda n: list(divisors(n)), (720720,)),
+    ('divisors', 'smooth 720720 unsorted', lambda n: list(divisors(n, False)), (720720,)),
+    ('extended_gcd', '2 x 60-bit', extended_gcd, ((45666020043321, 73433510078091009),)),
+    ('extended_gcd', '3 x 34-bit', extended_gcd, ((1122334455, 10101010101, 9898989898),)),
+    ('factor_integer', 'prime 1e6', factor_integer, (999983,)),
+    ('factor_integer', 'prime 1e9', factor_integer, (1000000007,)),
+    ('factor_integer', 'smooth 2**40', factor_integer, (2**40,)),
+    ('factor_integer', 'semiprime 1e8', factor_integer, (99460729,)),
+    ('factor_integer', 'semiprime 1e12', factor_integer, (999966000289,)),
+    ('gcd', '2 x 60-bit', gcd, ((45666020043321, 73433510078091009),)),
+    ('gcd', 'consecutive Fibonacci 200-bit', gcd, ((1806885656323799249738933639586633513160792578781310139745345, 2923602405716568564338475449381171413803636207598822186175234),)),
+    ('gcd_array', '10**4 pairs below 2**31', gcd_array, (_bases, _exps)),
+    ('hensel', 'degree 3 mod 7**2', hensel, (Polynomial((26, 2, 1, 1)), 16, 7, 2)),
+    ('inverse_mod', '60-bit modulus', inverse_mod, (45666020043321, 73433510078091009)),
+    ('inverse_mod_array', '10**4 values mod 2**31-1', inverse_mod_array, (_bases, 2**31 - 1)),
+    ('is_pairwise_coprime', 'primes below 1000', is_pairwise_coprime, (sieve(1000),)),
+    ('is_prime', 'prime 1e6', is_prime, (999983,)),
+    ('is_prime', 'prime 1e9', is_prime, (1000000007,)),
+    ('is_prime', 'prime 1e12', is_prime, (999999999989,)),
+    ('is_prime', 'semiprime 1e12', is_prime, (999966000289,)),
+    ('is_prime_array', '10**4 values below 2**31', is_prime_array, (_bases,)),
+    ('is_primitive_root', 'prime 1e9+7', is_primitive_root, (5, 1000000007)),
+    ('linear_congruence_solve', 'modulus 15', linear_congruence_solve, (9, 12, 15)),
+    ('linear_congruence_solve', 'modulus 28927951', linear_congruence_solve, (6789783, 2474010, 28927951)),
+    ('linear_diophantine_solve', '3 x 34-bit', linear_diophantine_solve, ((1122334455, 10101010101, 9898989898), 987654321)),
+    ('mertens', '1e6', mertens, (10**6,)),
+    ('mertens', '1e8', mertens, (10**8,)),
+    ('mobius', 'squarefree 1e9', mobius, (999999937 * 2,)),
+    ('modular_exp', '31-bit modulus', modular_exp, (7651, 2**31 - 2, 2**31 - 1)),
+    ('modular_exp', '127-bit modulus', modular_exp, (3, 2**127 - 2, 2**127 - 1)),
+    ('modular_exp', '521-bit modulus', modular_exp, (3, 2**521 - 2, 2**521 - 1)),
+    ('modular_exp', 'negative exponent', modular_exp, (9, -(2**61), 2**61 - 1)),
+    ('multiplicative_order', 'prime 1e9+7', multiplicative_order, (2, 1000000007)),
+    ('multiplicative_order', 'composite 2**20*3**5', multiplicative_order, (5, 2**20 * 3**5)),
+    ('poly_congruence_solve', 'degree 2 mod 27', poly_congruence_solve, (Polynomial((7, 1, 1)), 27)),
+    ('poly_congruence_solve', 'degree 7 mod 1323', poly_congruence_solve, (Polynomial((-649, -42, 0, 0, 0, 0, 0, 13)), 1323)),
+    ('poly_congruence_solve', 'degree 8 mod 539', poly_congruence_solve, (Polynomial((1001, 0, 0, 0, -1, 0, 0, 0, 1)), 539)),
+    ('poly_congruence_solve', 'degree 6 mod 6125', poly_congruence_solve, (Polynomial((-35, 0, 0, 0, 0, -2, 1)), 6125)),
+    ('poly_congruence_solve', 'degree 12 mod 10007', poly_congruence_solve, (Polynomial(range(1, 14)), 10007)),
+    ('Polynomial', 'degree 12 at 10**20', Polynomial(range(1, 14)), (10**20,)),
+    ('powmod_array', '10**4 values mod 2**31-1', powmod_array, (_bases, _exps, 2**31 - 1)),
+    ('primitive_root', 'prime 1e9+7', primitive_root, (1000000007,)),
+    ('primitive_root', 'prime power 2*3**12', primitive_root, (2 * 3**12,)),
+    ('sieve', '1e4', sieve, (10**4,)),
+    ('sieve', '1e5', sieve, (10**5,)),
+    ('sieve', '1e6', sieve, (10**6,)),
+    ('sum_over_divisors', 'totient over 720720', sum_over_divisors, (720720, totient)),
+    ('totient', 'smooth 720720', totient, (720720,)),
+    ('totient', 'semiprime 1e8', totient, (99460729,)),
+    ('totient_sum', '1e6', totient_sum, (10**6,)),
+    ('totient_sum', '1e8', totient_sum, (10**8,)),
+]
+
+
+# Memoization caches in dietnt, cleared before every call so that each call does its full work
+_CACHE_CLEARERS = [obj.cache_clear for obj in vars(dietnt).values() if hasattr(obj, 'cache_clear')]
+
+
+def _clear_caches():
+    for clear in _CACHE_CLEARERS:
+        clear()
+
+
+def _call(f, args):
+    _clear_caches()
+    return f(*args)
+
+
+def time_call(f, args, repeat, min_time):
+    '''Returns the best time in seconds per call of f(*args) over repeat runs, each of which lasts at least min_time seconds.'''
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for i in range(number):
+            _call(f, args)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    best = elapsed / number
+    for i in range(repeat - 1):
+        start = time.perf_counter()
+        for j in range(number):
+            _call(f, args)
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def peak_memory(f, args):
+    '''Returns the peak number of bytes allocated during one call of f(*args).'''
+    _clear_caches()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        f(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(corpus, repeat, min_time):
+    '''Returns a dictionary mapping "name[description]" to the time and peak memory of each benchmark.'''
+    results = {}
+    for name, desc, f, args in corpus:
+        results['{}[{}]'.format(name, desc)] = {'time': time_call(f, args, repeat, min_time),
+                                                 'memory': peak_memory(f, args)}
+    return results
+
+
+def compare(results, baseline, threshold):
+    '''Returns a list of (key, quantity, baseline value, new value) for every benchmark that regressed by more than the threshold fraction.'''
+    regressions = []
+    for key, new in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        if new['time'] > old['time'] * (1 + threshold):
+            regressions.append((key, 'time', old['time'], new['time']))
+        if new['memory'] > old['memory'] * (1 + threshold) and new['memory'] - old['memory'] > MEMORY_SLACK:
+            regressions.append((key, 'memory', old['memory'], new['memory']))
+    return regressions
+
+
+def _format_time(t):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if t >= scale:
+            return '{:.3g} {}'.format(t / scale, unit)
+    return '{:.3g} ns'.format(t / 1e-9)
+
+
+def report(results, baseline):
+    width = max(len(key) for key in results)
+    print('{:{}}  {:>10}  {:>10}  {:>8}'.format('benchmark', width, 'time', 'peak KiB', 'vs base'))
+    for key, new in results.items():
+        ratio = ''
+        if key in baseline:
+            ratio = '{:.2f}x'.format(new['time'] / baseline[key]['time'])
+        print('{:{}}  {:>10}  {:>10.1f}  {:>8}'.format(key, width, _format_time(new['time']), new['memory'] / 1024, ratio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark dietnt against a saved baseline.')
+    parser.add_argument('-k', '--filter', default='', help='only run benchmarks whose name contains this string')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file (default: %(default)s)')
+    parser.add_argument('--save', action='store_true', help='write the results to the baseline file instead of comparing')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed fractional slowdown before failing (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timing runs per benchmark (default: %(default)s)')
+    parser.add_argument('--min-time', type=float, default=0.05, help='minimum seconds per timing run (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    corpus = [c for c in CORPUS if args.filter in '{}[{}]'.format(c[0], c[1])]
+    if not corpus:
+        print('No benchmark matches {!r}.'.format(args.filter), file=sys.stderr)
+        return 2
+
+    baseline = {}
+    if not args.save:
+        if not os.path.exists(args.baseline):
+            print('No baseline at {}; record one with --save first.'.format(args.baseline), file=sys.stderr)
+            return 2
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = run(corpus, args.repeat, args.min_time)
+    report(results, baseline)
+
+    if args.save:
+        saved = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                saved = json.load(f)
+        saved.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(saved, f, indent=1, sort_keys=True)
+        print('\nSaved {} results to {}'.format(len(results), args.baseline))
+        return 0
+
+    missing = [key for key in results if key not in baseline]
+    if missing:
+        print('\nWarning: {} benchmark(s) have no baseline entry and were not checked; update the baseline with --save:'.format(len(missing)))
+        for key in missing:
+            print('  ' + key)
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print('\n{} regression(s) beyond {:.0%}:'.format(len(regressions), args.threshold))
+        for key, quantity, old, new in regressions:
+            print('  {} {}: {:.4g} -> {:.4g} ({:.2f}x)'.format(key, quantity, old, new, new / old))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
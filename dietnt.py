@@ -3,7 +3,15 @@
 This module contains a small suite of functions for performing computations in elementary number theory. The algorithms used are generally on the simple end of the spectrum. If you need better performance or a more comprehensive collection of functions, look into SymPy.
 '''
 
-import functools, itertools, math, operator
+import array, contextlib, contextvars, functools, heapq, itertools, math, operator, random, time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The Profile active in the current thread or task, or None when profiling is off; see profile()
+_profile = contextvars.ContextVar('dietnt_profile', default=None)
 
 
 
@@ -102,6 +110,159 @@ class Polynomial:
             
 
 
+class DiscreteLog:
+    def __init__(self, g, m):
+        '''Precomputes what is needed to take discrete logarithms to the base g modulo m, so that repeated calls with the same g and m share the work.
+
+        The order of g is found from the cached factorization of λ(m), the exponent of the group of units. For each prime q dividing the order, a baby-step giant-step table is built for the subgroup of order q when q is at most _BSGS_LIMIT; larger subgroups are searched with Pollard's rho method instead.
+        '''
+        self.g = g % m
+        self.m = m
+        self.order = None
+        self.order_factors = {}
+        self._tables = {}
+        if gcd((self.g, m)) != 1:
+            return
+
+        self.order, self.order_factors = _element_order(self.g, m)
+        for q in self.order_factors:
+            gamma = modular_exp(self.g, self.order // q, m)
+            if q <= _BSGS_LIMIT:
+                self._tables[q] = _bsgs_table(gamma, q, m)
+            else:
+                self._tables[q] = None
+
+
+    def __call__(self, h):
+        '''Returns the least nonnegative x such that g**x ≡ h (mod m) or None if no such x exists.'''
+        g, m = self.g, self.m
+        h = h % m
+        if self.order is None or gcd((h, m)) != 1:
+            return None
+        if self.order == 1:
+            return 0 if h == 1 % m else None
+        if modular_exp(h, self.order, m) != 1:
+            return None
+
+        residues = []
+        moduli = []
+        for q, e in self.order_factors.items():
+            n = self.order // q**e
+            g_q = modular_exp(g, n, m)
+            h_q = modular_exp(h, n, m)
+            gamma = modular_exp(g, self.order // q, m)
+            g_q_inv = inverse_mod(g_q, m)
+            x = 0
+            for k in range(e):
+                beta = modular_exp(h_q * modular_exp(g_q_inv, x, m), q**(e-1-k), m)
+                if self._tables[q] is None:
+                    d = _pollard_rho_log(gamma, beta, q, m)
+                else:
+                    d = _bsgs_lookup(self._tables[q], beta, m)
+                if d is None:
+                    return None
+                x += d * q**k
+            residues.append(x)
+            moduli.append(q**e)
+
+        x = chinese_remainder(residues, moduli)
+        if modular_exp(g, x, m) != h:
+            return None
+        return x
+
+
+
+@functools.lru_cache(maxsize=1024)
+def _unit_group(m):
+    '''Returns φ(m) and the factorization of λ(m), the exponent of the group of units modulo m.
+
+    Results are cached, so the returned dictionary is shared and must not be modified.
+    '''
+    phi = 1
+    lam = {}
+    for p, e in factor_integer(m).items():
+        phi *= p**(e-1) * (p-1)
+        if p == 2:
+            factors = {2: e-2} if e > 2 else {2: e-1}
+        else:
+            factors = _merge_factors(factor_integer(p-1), {p: e-1})
+        for q, k in factors.items():
+            if k > lam.get(q, 0):
+                lam[q] = k
+    return phi, lam
+
+
+
+def _element_order(g, m):
+    '''Returns the multiplicative order of g modulo m and its factorization, starting from the factorization of λ(m); g must be relatively prime to m.'''
+    factors = dict(_unit_group(m)[1])
+    order = functools.reduce(operator.mul, (p**e for p, e in factors.items()), 1)
+    for q in list(factors):
+        while factors[q] and modular_exp(g, order // q, m) == 1:
+            order //= q
+            factors[q] -= 1
+        if factors[q] == 0:
+            del factors[q]
+    return order, factors
+
+
+
+def carmichael(m):
+    '''Carmichael's function; that is, the least positive λ(m) such that a**λ(m) ≡ 1 (mod m) for every a relatively prime to m.'''
+    assert m > 0
+    return functools.reduce(operator.mul, (q**k for q, k in _unit_group(m)[1].items()), 1)
+
+
+
+class Profile:
+    def __init__(self):
+        '''Holds the counters and timers that dietnt records while profiling is on. Profiles are created by the profile context manager.
+
+        counters maps stage names such as 'factor_integer.divisions' to event counts, timers maps stage names such as 'poly_congruence.hensel' to total seconds, and caches maps the names of memoized functions to their (hits, misses) while the profile was active.
+        '''
+        self.counters = {}
+        self.timers = {}
+        self.caches = {}
+
+
+    def count(self, stage, k=1):
+        self.counters[stage] = self.counters.get(stage, 0) + k
+
+
+    def add_time(self, stage, seconds):
+        self.timers[stage] = self.timers.get(stage, 0.0) + seconds
+
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        '''Context manager adding the time spent in its body to the named stage.'''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+
+    def merge(self, other):
+        '''Adds the counters and timers of another profile to this one.'''
+        for stage, k in other.counters.items():
+            self.count(stage, k)
+        for stage, seconds in other.timers.items():
+            self.add_time(stage, seconds)
+
+
+    def __str__(self):
+        lines = []
+        for stage in sorted(self.timers):
+            lines.append('{}: {:.6f} s'.format(stage, self.timers[stage]))
+        for stage in sorted(self.counters):
+            lines.append('{}: {}'.format(stage, self.counters[stage]))
+        for name in sorted(self.caches):
+            lines.append('{}: {} hits, {} misses'.format(name, *self.caches[name]))
+        return '\n'.join(lines)
+
+
+
 def chinese_remainder(a, m):
     '''Solves a system of congruences specified by the list of residues, a, and list of moduli, m.
 
@@ -119,6 +280,150 @@ def chinese_remainder(a, m):
 
 
 
+# Subgroups of prime order at most this use baby-step giant-step, which stores about sqrt(q) residues (65536 at the limit); larger ones use Pollard's rho method
+_BSGS_LIMIT = 2**32
+
+# Pollard rho walks that end in a useless collision before giving up. When beta is a power of gamma such a walk happens with probability about 1/q; when it is not, every walk does.
+_RHO_ATTEMPTS = 32
+
+# Subgroups of prime order at most this are too small for the rho walk and are searched directly
+_RHO_MIN = 2**10
+
+
+
+def _bsgs_table(gamma, q, m):
+    '''Returns the baby steps {gamma**j: j} for j < s, the giant step multiplier gamma**(-s) and s, where gamma has prime order q modulo m and s is about sqrt(q).'''
+    s = int(math.sqrt(q)) + 1
+    baby = {}
+    y = 1
+    for j in range(s):
+        baby.setdefault(y, j)
+        y = y * gamma % m
+    return baby, inverse_mod(y, m), s
+
+
+
+def _bsgs_lookup(table, beta, m):
+    '''Returns the discrete logarithm of beta in the subgroup described by a table from _bsgs_table or None if beta is not in it.'''
+    baby, giant, s = table
+    y = beta
+    for i in range(s):
+        if y in baby:
+            prof = _profile.get()
+            if prof is not None:
+                prof.count('discrete_log.giant_steps', i)
+            return i*s + baby[y]
+        y = y * giant % m
+    prof = _profile.get()
+    if prof is not None:
+        prof.count('discrete_log.giant_steps', s)
+    return None
+
+
+
+def _pollard_rho_log(gamma, beta, q, m):
+    '''Returns d such that gamma**d ≡ beta (mod m), where gamma has prime order q, or None if beta is not a power of gamma, using Pollard's rho method with Floyd cycle detection.'''
+    if modular_exp(beta, q, m) != 1:
+        return None
+    if q <= _RHO_MIN:
+        # The walk's partition by x % 3 degenerates in tiny subgroups, so search them directly
+        y = 1
+        for d in range(q):
+            if y == beta:
+                return d
+            y = y * gamma % m
+        return None
+
+    def step(x, a, b):
+        r = x % 3
+        if r == 0:
+            return x * beta % m, a, (b+1) % q
+        if r == 1:
+            return x * x % m, 2*a % q, 2*b % q
+        return x * gamma % m, (a+1) % q, b
+
+    for attempt in range(_RHO_ATTEMPTS):
+        prof = _profile.get()
+        if prof is not None:
+            prof.count('discrete_log.rho_walks')
+        a, b = random.randrange(q), random.randrange(q)
+        x = modular_exp(gamma, a, m) * modular_exp(beta, b, m) % m
+        X, A, B = x, a, b
+        while True:
+            x, a, b = step(x, a, b)
+            X, A, B = step(*step(X, A, B))
+            if x == X:
+                break
+        # gamma**(a-A) ≡ beta**(B-b), so d*(B-b) ≡ a-A (mod q)
+        if (B - b) % q == 0:
+            continue
+        d = (a - A) * inverse_mod((B - b) % q, q) % q
+        if modular_exp(gamma, d, m) == beta:
+            return d
+        return None
+    return None
+
+
+
+def discrete_log(g, h, m):
+    '''Returns the least nonnegative x such that g**x ≡ h (mod m) or None if no such x exists or g is not relatively prime to m.
+
+    Uses the Pohlig-Hellman algorithm over the factorization of the order of g. To take many logarithms to the same base, build a DiscreteLog once and call it instead.
+    '''
+    return DiscreteLog(g, m)(h)
+
+
+
+def divisors(n, sort=True, factors=None):
+    '''Generator yielding the positive divisors of n, in increasing order if sort is True and in no particular order otherwise.
+
+    The divisors are built from the prime factorization of n, which may be passed as factors (in the form returned by factor_integer) to avoid refactoring n.
+    '''
+    assert n > 0
+    if factors is None:
+        factors = factor_integer(n)
+
+    if not sort:
+        powers = [[p**i for i in range(e+1)] for p, e in factors.items()]
+        for c in itertools.product(*powers):
+            yield functools.reduce(operator.mul, c, 1)
+        return
+
+    # Each divisor is reached only by appending primes in nondecreasing order;
+    # heap entries are (divisor, index of its largest prime, exponent of that prime)
+    primes = sorted(factors)
+    heap = [(1, 0, 0)]
+    while heap:
+        d, i, e = heapq.heappop(heap)
+        yield d
+        if primes and e < factors[primes[i]]:
+            heapq.heappush(heap, (d * primes[i], i, e+1))
+        for j in range(i+1, len(primes)):
+            heapq.heappush(heap, (d * primes[j], j, 1))
+
+
+
+def divisor_count(n, factors=None):
+    '''Returns the number of positive divisors of n, optionally using the precomputed factorization factors.'''
+    assert n > 0
+    if factors is None:
+        factors = factor_integer(n)
+    return functools.reduce(operator.mul, (e+1 for e in factors.values()), 1)
+
+
+
+def divisor_sigma(n, k=1, factors=None):
+    '''Returns the sum of the kth powers of the positive divisors of n, optionally using the precomputed factorization factors.'''
+    assert n > 0 and k >= 0
+    if factors is None:
+        factors = factor_integer(n)
+    if k == 0:
+        return divisor_count(n, factors)
+    return functools.reduce(operator.mul,
+                            ((p**(k*(e+1)) - 1) // (p**k - 1) for p, e in factors.items()), 1)
+
+
+
 def extended_gcd(args):
     '''Returns a list whose first argument is the GCD and whose second argument is a list of Bézout coefficients for one or more nonnegative integers.\
     '''
@@ -187,16 +492,28 @@ def factor_integer(n):
         return {n: 1}
 
     if n % 2 == 0:
+        prof = _profile.get()
+        if prof is not None:
+            prof.count('factor_integer.divisions')
         return _merge_factors({2: 1}, factor_integer(n // 2))
     if n % 3 == 0:
+        prof = _profile.get()
+        if prof is not None:
+            prof.count('factor_integer.divisions', 2)
         return _merge_factors({3: 1}, factor_integer(n // 3))
 
     root_n = int(math.sqrt(n))
     for i in range(6, root_n+2, 6):
         for j in (i-1, i+1):
             if n % j == 0:
+                prof = _profile.get()
+                if prof is not None:
+                    prof.count('factor_integer.divisions', 2 + 2*(i//6) - (j == i-1))
                 return _merge_factors(factor_integer(j), factor_integer(n // j))
 
+    prof = _profile.get()
+    if prof is not None:
+        prof.count('factor_integer.divisions', 2 + 2*len(range(6, root_n+2, 6)))
     return {n: 1}
 
 
@@ -225,6 +542,66 @@ def gcd(args):
 
 
 
+def _word_array(values, bound):
+    '''Returns values flattened into a NumPy uint64 array, or None if NumPy is unavailable or some value lies outside [0, bound).'''
+    if numpy is None:
+        return None
+    a = numpy.asarray(values)
+    if a.dtype.kind not in 'iu':
+        return None
+    if a.size and (a.min() < 0 or a.max() >= bound):
+        return None
+    return a.astype(numpy.uint64).ravel()
+
+
+
+def _flat(values):
+    '''Returns the entries of values in order, flattening NumPy arrays and nested sequences of any dimension when NumPy is available.'''
+    if numpy is None:
+        return values
+    return numpy.asarray(values, dtype=object).ravel().tolist()
+
+
+
+def _shaped_like(result, values):
+    '''Returns the flat list result nested to match the shape of values, which may be a NumPy array of any dimension.'''
+    if numpy is None or numpy.ndim(values) <= 1:
+        return result
+    return numpy.array(result, dtype=object).reshape(numpy.shape(values)).tolist()
+
+
+
+def _check_same_shape(a, b):
+    '''Raises ValueError unless a and b have the same length and, for NumPy arrays, the same shape.'''
+    if len(a) != len(b) or (numpy is not None and numpy.shape(a) != numpy.shape(b)):
+        raise ValueError('arguments must have the same shape')
+
+
+
+def gcd_array(a, b):
+    '''Returns the list of greatest common divisors of corresponding entries of the nonnegative integer sequences a and b, which must have the same shape. Multidimensional NumPy arrays give correspondingly nested lists.
+
+    Uses a vectorized Euclidean algorithm when NumPy is available and every value is below 2**64, and falls back to gcd otherwise.
+    '''
+    _check_same_shape(a, b)
+    x = _word_array(a, 2**64)
+    y = _word_array(b, 2**64)
+    if x is None or y is None:
+        return _shaped_like([gcd((int(i), int(j))) for i, j in zip(_flat(a), _flat(b))], a)
+
+    # Only the pairs still running stay in the working arrays
+    idx = numpy.flatnonzero(y)
+    x, y, result = x[idx], y[idx], x.copy()
+    while idx.size:
+        x, y = y, x % y
+        done = y == 0
+        result[idx[done]] = x[done]
+        keep = ~done
+        idx, x, y = idx[keep], x[keep], y[keep]
+    return _shaped_like(result.tolist(), a)
+
+
+
 def hensel(f, r, p, k):
     fp = f.derivative()
     if fp(r) % p:
@@ -234,6 +611,9 @@ def hensel(f, r, p, k):
     if f(r) % p**(k+1):
         return set()
 
+    prof = _profile.get()
+    if prof is not None:
+        prof.count('poly_congruence.hensel_branches')
     solutions = set()
     for t in range(p):
         solutions.add(r + t*p**k)
@@ -251,6 +631,40 @@ def inverse_mod(a, m):
 
 
 
+def inverse_mod_array(a, m):
+    '''Returns the list of inverses modulo m of the entries of a, with None wherever no inverse exists. A multidimensional NumPy array gives a correspondingly nested list.
+
+    Uses a vectorized extended Euclidean algorithm when NumPy is available and a and m are nonnegative and below 2**63, and falls back to inverse_mod otherwise.
+    '''
+    x = _word_array(a, 2**63)
+    if x is None or not 0 < m < 2**63:
+        return _shaped_like([inverse_mod(int(i), m) for i in _flat(a)], a)
+
+    # Invariant: r0 ≡ t0*a and r1 ≡ t1*a (mod m)
+    r0 = numpy.full(x.shape, m, dtype=numpy.int64)
+    r1 = (x % numpy.uint64(m)).astype(numpy.int64)
+    t0 = numpy.zeros(x.shape, dtype=numpy.int64)
+    t1 = numpy.ones(x.shape, dtype=numpy.int64)
+    g = numpy.empty(x.shape, dtype=numpy.int64)
+    inv = numpy.empty(x.shape, dtype=numpy.int64)
+    idx = numpy.arange(x.size)
+    while idx.size:
+        done = r1 == 0
+        g[idx[done]] = r0[done]
+        inv[idx[done]] = t0[done] % m
+        keep = ~done
+        idx, r0, r1, t0, t1 = idx[keep], r0[keep], r1[keep], t0[keep], t1[keep]
+        q = r0 // r1
+        r0, r1 = r1, r0 - q*r1
+        t0, t1 = t1, t0 - q*t1
+
+    result = inv.tolist()
+    for i in numpy.flatnonzero(g != 1).tolist():
+        result[i] = None
+    return _shaped_like(result, a)
+
+
+
 def is_pairwise_coprime(m):
     '''Returns True if the list of nonnegative integers is pairwise relatively prime and False otherwise.'''
     for i in range(len(m)):
@@ -268,12 +682,74 @@ def is_prime(n):
     if n <= 3:
         return True
     if n % 2 == 0 or n % 3 == 0:
+        prof = _profile.get()
+        if prof is not None:
+            prof.count('is_prime.divisions', 1 if n % 2 == 0 else 2)
         return False
     root_n = int(math.sqrt(n))
     for i in range(6, root_n+2, 6):
         for j in (i-1, i+1):
             if n % j == 0:
+                prof = _profile.get()
+                if prof is not None:
+                    prof.count('is_prime.divisions', 2 + 2*(i//6) - (j == i-1))
                 return False
+    prof = _profile.get()
+    if prof is not None:
+        prof.count('is_prime.divisions', 2 + 2*len(range(6, root_n+2, 6)))
+    return True
+
+
+
+def is_prime_array(n):
+    '''Returns a list whose entries are True where the corresponding entry of n is prime and False otherwise. A multidimensional NumPy array gives a correspondingly nested list.
+
+    Uses a vectorized deterministic Miller-Rabin test with bases 2, 7 and 61 when NumPy is available and every value is below 2**32, and falls back to is_prime otherwise.
+    '''
+    x = _word_array(n, 2**32)
+    if x is None:
+        return _shaped_like([is_prime(int(i)) for i in _flat(n)], n)
+
+    result = numpy.isin(x, sieve(64))
+    idx = numpy.flatnonzero((x >= 64) & (x % 2 == 1))
+    x = x[idx]
+
+    # Write x - 1 = d * 2**s with d odd
+    d = x - 1
+    s = numpy.zeros(x.shape, dtype=numpy.uint64)
+    even = d % 2 == 0
+    while even.any():
+        d[even] >>= 1
+        s[even] += 1
+        even = d % 2 == 0
+
+    composite = numpy.zeros(x.shape, dtype=bool)
+    rounds = int(s.max()) if s.size else 0
+    for a in (2, 7, 61):
+        y = _powmod_kernel(numpy.full_like(x, a), d, x)
+        witness_fails = (y == 1) | (y == x - 1)
+        for r in range(1, rounds):
+            y = y * y % x
+            witness_fails |= (y == x - 1) & (r < s)
+        composite |= ~witness_fails
+
+    result[idx] = ~composite
+    return _shaped_like(result.tolist(), n)
+
+
+
+def is_primitive_root(g, m):
+    '''Returns True if g is a primitive root modulo m and False otherwise.'''
+    assert m > 0
+    g = g % m
+    if gcd((g, m)) != 1:
+        return False
+    phi, lam = _unit_group(m)
+    if functools.reduce(operator.mul, (q**k for q, k in lam.items()), 1) != phi:
+        return False
+    for q in lam:
+        if modular_exp(g, phi // q, m) == 1:
+            return False
     return True
 
 
@@ -302,6 +778,89 @@ def linear_diophantine_solve(a,b):
     return egcd[1]
 
 
+
+def _summatory(n, prefix, total):
+    '''Returns F(n) for the summatory function F determined by F(x) = total(x) - sum(F(x//k) for k in range(2, x+1)), where prefix[x] = F(x) for small x.
+
+    The terms are grouped by the value of x//k, and F is memoized at the floor quotients of n above the prefix table. With a prefix table of length about n**(2/3), this takes about n**(2/3) time.
+    '''
+    limit = len(prefix) - 1
+    cache = {}
+
+    def F(x):
+        if x <= limit:
+            return prefix[x]
+        if x in cache:
+            return cache[x]
+        s = total(x)
+        k = 2
+        while k <= x:
+            q = x // k
+            k_next = x // q + 1
+            s -= (k_next - k) * F(q)
+            k = k_next
+        cache[x] = s
+        return s
+
+    return F(n)
+
+
+
+def _sieve_limit(n):
+    '''Returns the size of the sieved prefix table used by the summatory functions for argument n.'''
+    return min(n, max(int(n ** (2/3)), 100))
+
+
+
+def _primes_below(n):
+    '''Returns an iterator over the primes less than n, sieved in a bytearray so that large n stay compact.'''
+    flags = bytearray([1]) * max(n, 2)
+    flags[0] = flags[1] = 0
+    for i in range(2, int(math.sqrt(n)) + 1):
+        if flags[i]:
+            flags[i*i::i] = bytes(len(range(i*i, n, i)))
+    return itertools.compress(range(n), flags)
+
+
+
+# Maps each byte of an array('b') to the byte of its negation
+_NEGATE_BYTE = bytes((-i) % 256 for i in range(256))
+
+
+
+def _mobius_sieve(n):
+    '''Returns an array('b') whose ith entry is the Mobius function of i for 0 < i < n; the 0th entry is 0.
+
+    The summatory functions sieve about n**(2/3) entries, so the tables are typed arrays rather than lists of int objects.
+    '''
+    mu = array.array('b', [1]) * n
+    mu[0] = 0
+    for p in _primes_below(n):
+        mu[p::p] = array.array('b', mu[p::p].tobytes().translate(_NEGATE_BYTE))
+        mu[p*p::p*p] = array.array('b', bytes(len(range(p*p, n, p*p))))
+    return mu
+
+
+
+def _prefix_sums(values):
+    '''Replaces the entries of the array values by their running sums, working in chunks to avoid a second full-size array.'''
+    chunk = 2**16
+    total = 0
+    for start in range(0, len(values), chunk):
+        block = array.array(values.typecode, itertools.accumulate(values[start:start+chunk], initial=total))
+        values[start:start+chunk] = block[1:]
+        total = block[-1]
+    return values
+
+
+
+def mertens(n):
+    '''Mertens function; that is, the sum of the Mobius function over 1, 2, ..., n.'''
+    assert n >= 0
+    prefix = _prefix_sums(array.array('q', _mobius_sieve(_sieve_limit(n) + 1)))
+    return _summatory(n, prefix, lambda x: 1)
+
+
 def mobius(n):
     '''
     Mobius function.
@@ -348,14 +907,71 @@ def modular_exp(b, n, m):
 
 
 
+def _powmod_kernel(b, n, m):
+    '''Evaluates b**n % m elementwise by square-and-multiply over uint64 arrays; every modulus must be below 2**32 so that products cannot overflow.'''
+    result = numpy.ones_like(b)
+    b = b % m
+    n = n.copy()
+    while n.any():
+        odd = (n & 1).astype(bool)
+        result = numpy.where(odd, result * b % m, result)
+        b = b * b % m
+        n >>= 1
+    return result
+
+
+
+def powmod_array(bases, exps, m):
+    '''Returns the list of b**n % m for corresponding entries b of bases and n of exps, which must have the same shape. Multidimensional NumPy arrays give correspondingly nested lists.
+
+    Uses vectorized square-and-multiply when NumPy is available, m is below 2**32 and the bases and exponents are nonnegative and below 2**64, and falls back to modular_exp otherwise.
+    '''
+    _check_same_shape(bases, exps)
+    b = _word_array(bases, 2**64)
+    n = _word_array(exps, 2**64)
+    if b is None or n is None or not 0 < m < 2**32:
+        return _shaped_like([modular_exp(int(i), int(j), m) for i, j in zip(_flat(bases), _flat(exps))], bases)
+
+    return _shaped_like(_powmod_kernel(b, n, numpy.uint64(m)).tolist(), bases)
+
+
+
+def multiplicative_order(a, m):
+    '''Returns the least positive k such that a**k ≡ 1 (mod m) or None if a is not relatively prime to m.'''
+    assert m > 0
+    a = a % m
+    if gcd((a, m)) != 1:
+        return None
+    return _element_order(a, m)[0]
+
+
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+
+def _stage(name):
+    '''Returns a context manager timing the named stage in the active profile, or one that does nothing when profiling is off.'''
+    prof = _profile.get()
+    if prof is None:
+        return _NULL_STAGE
+    return prof.timer(name)
+
+
+
 def _poly_congruence_prime_power(f, p, k):
-    solns = _poly_congruence_brute(f, p)
+    with _stage('poly_congruence.brute'):
+        solns = _poly_congruence_brute(f, p)
     
-    for i in range(1,k):
-        new_solns = set()
-        for j in solns:
-            new_solns |= hensel(f, j, p, i)
-        solns = new_solns
+    with _stage('poly_congruence.hensel'):
+        for i in range(1,k):
+            new_solns = set()
+            for j in solns:
+                new_solns |= hensel(f, j, p, i)
+            prof = _profile.get()
+            if prof is not None:
+                prof.count('poly_congruence.lifts', len(solns))
+            solns = new_solns
 
     return solns
 
@@ -368,6 +984,9 @@ def _poly_congruence_brute(p, m):
     for x in range(m):
         if p(x) % m == 0:
             solutions.add(x)
+    prof = _profile.get()
+    if prof is not None:
+        prof.count('poly_congruence.candidates', m)
     return solutions
 
 
@@ -375,22 +994,70 @@ def _poly_congruence_brute(p, m):
 def poly_congruence_solve(f, m):
     '''Returns the solution set of a polynomial congruence of the form f(x) ≡ 0 (mod m).
     '''
-    factor_dict = factor_integer(m)
+    with _stage('poly_congruence.factor'):
+        factor_dict = factor_integer(m)
     soln_sets_list = []
     moduli = []
     for prime in factor_dict:
         soln_sets_list.append(_poly_congruence_prime_power(f, prime, factor_dict[prime]))
         moduli.append(prime**factor_dict[prime])
     
-    cartesian_product = itertools.product(*soln_sets_list)
-    solutions = set()
-    for a in cartesian_product:
-        solutions.add(chinese_remainder(a, moduli))
+    with _stage('poly_congruence.crt'):
+        cartesian_product = itertools.product(*soln_sets_list)
+        solutions = set()
+        for a in cartesian_product:
+            solutions.add(chinese_remainder(a, moduli))
+        prof = _profile.get()
+        if prof is not None:
+            prof.count('poly_congruence.crt_reconstructions', functools.reduce(operator.mul, map(len, soln_sets_list), 1))
 
     return solutions
 
 
 
+@functools.lru_cache(maxsize=1024)
+def primitive_root(m):
+    '''Returns the least positive primitive root modulo m or None if m has no primitive root.'''
+    assert m > 0
+    if m == 1:
+        return 1
+    phi, lam = _unit_group(m)
+    if functools.reduce(operator.mul, (q**k for q, k in lam.items()), 1) != phi:
+        return None
+    for g in range(1, m):
+        if is_primitive_root(g, m):
+            return g
+
+
+
+@contextlib.contextmanager
+def profile():
+    '''Context manager that turns on instrumentation and yields a Profile collecting it.
+
+    While a profile is active, dietnt records per-stage counters (trial divisions, brute-force candidates, Hensel lifts and branches, CRT reconstructions, discrete logarithm steps), timers for the stages of poly_congruence_solve, and hits and misses of its memoization caches. Profiling is off by default, and then each instrumented stage costs one context variable lookup. The active profile is held in a context variable, so profiles in different threads or asyncio tasks do not see each other's events, except for the cache statistics, which come from process-wide caches. Profiles nest; events recorded in an inner profile also count toward the outer one.
+
+    For example,
+
+    with profile() as p:
+        poly_congruence_solve(f, m)
+    print(p.counters['poly_congruence.candidates'])
+    '''
+    outer = _profile.get()
+    p = Profile()
+    caches = [(f, f.cache_info()) for f in (_unit_group, primitive_root)]
+    token = _profile.set(p)
+    try:
+        yield p
+    finally:
+        _profile.reset(token)
+        for f, before in caches:
+            after = f.cache_info()
+            p.caches[f.__name__] = (after.hits - before.hits, after.misses - before.misses)
+        if outer is not None:
+            outer.merge(p)
+
+
+
 def sieve(n):
     '''Returns a list of all primes less than n using the sieve of Eratosthenes.'''
     if n < 2:
@@ -414,6 +1081,12 @@ def sieve(n):
     return prime_list
 
 
+def sum_over_divisors(n, f, factors=None):
+    '''Returns the sum of f(d) over the positive divisors d of n, optionally using the precomputed factorization factors.'''
+    return sum(map(f, divisors(n, False, factors)))
+
+
+
 def totient(n):
     '''
     Euler's totient function.
@@ -427,7 +1100,24 @@ def totient(n):
                             (p**(factors[p]-1) * (p-1) for p in factors))
 
 
+def _totient_sieve(n):
+    '''Returns an array('q') whose ith entry is Euler's totient function of i for 0 < i < n; the 0th entry is 0.'''
+    phi = array.array('q', range(n))
+    for p in _primes_below(n):
+        phi[p::p] = array.array('q', (x - x//p for x in phi[p::p]))
+    return phi
+
+
+def totient_sum(n):
+    '''
+    Summatory totient function; that is, the sum of Euler's totient function over 1, 2, ..., n.
+    '''
+    assert n >= 0
+    prefix = _prefix_sums(_totient_sieve(_sieve_limit(n) + 1))
+    return _summatory(n, prefix, lambda x: x*(x+1) // 2)
+
+
 def dirichlet_product(f, g):
     def h(n):
-        return functools.reduce(operator.add, (f(d)*g(n//d) for d in range(1,n+1) if n % d == 0))
+        return sum_over_divisors(n, lambda d: f(d)*g(n//d))
     return h
@@ -0,0 +1,76 @@
+from bench_dietnt import MEMORY_SLACK, compare, main
+import bench_dietnt
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+
+class TestCompare(unittest.TestCase):
+    def test_compare(self):
+        baseline = {'f[a]': {'time': 1.0, 'memory': 100000},
+                    'f[b]': {'time': 1.0, 'memory': 100000},
+                    'f[c]': {'time': 1.0, 'memory': 1000}}
+        test_cases = [({'f[a]': {'time': 1.2, 'memory': 100000}}, []),
+                      ({'f[a]': {'time': 1.3, 'memory': 100000}}, [('f[a]', 'time', 1.0, 1.3)]),
+                      ({'f[b]': {'time': 0.5, 'memory': 130000}}, [('f[b]', 'memory', 100000, 130000)]),
+                      ({'f[b]': {'time': 2.0, 'memory': 130000}}, [('f[b]', 'time', 1.0, 2.0), ('f[b]', 'memory', 100000, 130000)]),
+                      ({'f[c]': {'time': 1.0, 'memory': 1000 + MEMORY_SLACK}}, []),
+                      ({'f[c]': {'time': 1.0, 'memory': 1001 + MEMORY_SLACK}}, [('f[c]', 'memory', 1000, 1001 + MEMORY_SLACK)]),
+                      ({'f[d]': {'time': 100.0, 'memory': 10**9}}, [])]
+        for results, ex in test_cases:
+            with self.subTest(results=results):
+                self.assertEqual(compare(results, baseline, 0.25), ex)
+
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.baseline = os.path.join(tmp.name, 'baseline.json')
+        corpus = [('square', 'small', lambda x: x*x, (3,)),
+                  ('square', 'large', lambda x: x*x, (10**100,))]
+        patcher = mock.patch.object(bench_dietnt, 'CORPUS', corpus)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+    def run_main(self, *args):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+            status = main(['--baseline', self.baseline, '--repeat', '1', '--min-time', '0.001'] + list(args))
+        return status, out.getvalue()
+
+
+    def test_exit_codes(self):
+        self.assertEqual(self.run_main()[0], 2)
+        self.assertEqual(self.run_main('-k', 'nonexistent')[0], 2)
+        self.assertEqual(self.run_main('--save')[0], 0)
+        self.assertEqual(self.run_main('--threshold', '1000')[0], 0)
+
+        with open(self.baseline) as f:
+            saved = json.load(f)
+        self.assertEqual(sorted(saved), ['square[large]', 'square[small]'])
+        saved['square[small]']['time'] /= 10**6
+        with open(self.baseline, 'w') as f:
+            json.dump(saved, f)
+        status, out = self.run_main()
+        self.assertEqual(status, 1)
+        self.assertIn('square[small] time', out)
+
+
+    def test_missing_key_warning(self):
+        self.assertEqual(self.run_main('--save', '-k', 'small')[0], 0)
+        status, out = self.run_main('--threshold', '1000')
+        self.assertEqual(status, 0)
+        self.assertIn('no baseline entry', out)
+        self.assertIn('  square[large]', out)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
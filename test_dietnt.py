@@ -3,8 +3,15 @@ primes_to_100 = primes_to_1000[:25]
 
 
 from dietnt import *
-from dietnt import _binary_powers_mod, _poly_congruence_prime_power
+from dietnt import _binary_powers_mod, _poly_congruence_prime_power, _pollard_rho_log
+import threading
 import unittest
+from unittest import mock
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class TestChineseRemainder(unittest.TestCase):
@@ -21,6 +28,114 @@ class TestChineseRemainder(unittest.TestCase):
 
 
 
+class TestDiscreteLog(unittest.TestCase):
+    def test_discrete_log(self):
+        test_cases = [(2, 1, 13, 0),
+                      (2, 3, 13, 4),
+                      (3, 13, 17, 4),
+                      (5, 8, 23, 6),
+                      (2, 1, 15, 0),
+                      (2, 8, 15, 3),
+                      (2, 3, 15, None),
+                      (4, 2, 13, None),
+                      (6, 4, 15, None),
+                      (7, 0, 1, 0),
+                      (3, 7, 1000000007, 70669385),
+                      (5, 123456789, 2**40 + 15, 152743918625)]
+        for g, h, m, ex in test_cases:
+            with self.subTest(g=g, h=h, m=m, ex=ex):
+                self.assertEqual(discrete_log(g, h, m), ex)
+
+
+    def test_discrete_log_table(self):
+        m = 1000003
+        log = DiscreteLog(2, m)
+        for x in (0, 1, 17, 500000, 1000001):
+            with self.subTest(x=x):
+                self.assertEqual(log(modular_exp(2, x, m)), x % log.order)
+
+
+    def test_discrete_log_rho(self):
+        # gamma and beta both have order 11 in the non-cyclic units mod 23*67, but beta is not a power of gamma
+        gamma = chinese_remainder((5**2 % 23, 1), (23, 67))
+        beta = chinese_remainder((1, 2**6 % 67), (23, 67))
+        test_cases = [(2, 9, 1000003),
+                      (5, 6, 1000003),
+                      (3, 7, 1000000007),
+                      (2, 8, 15),
+                      (2, 3, 15),
+                      (7, 100, 3**5 * 11**2),
+                      (7, 5, 3**5 * 11**2),
+                      (gamma, gamma**3 % 1541, 1541),
+                      (gamma, beta, 1541)]
+        for g, h, m in test_cases:
+            with self.subTest(g=g, h=h, m=m):
+                ex = discrete_log(g, h, m)
+                with mock.patch('dietnt._BSGS_LIMIT', 1):
+                    self.assertEqual(discrete_log(g, h, m), ex)
+        self.assertIsNone(discrete_log(gamma, beta, 1541))
+        self.assertIsNone(_pollard_rho_log(gamma, beta, 11, 1541))
+        # The same situation with q = 1031 large enough for the rho walk, mod 2063*12373
+        m = 2063 * 12373
+        gamma = chinese_remainder((modular_exp(5, 2, 2063), 1), (2063, 12373))
+        beta = chinese_remainder((1, modular_exp(2, 12, 12373)), (2063, 12373))
+        self.assertIsNone(_pollard_rho_log(gamma, beta, 1031, m))
+        self.assertEqual(_pollard_rho_log(gamma, modular_exp(gamma, 500, m), 1031, m), 500)
+        with mock.patch('dietnt._BSGS_LIMIT', 1):
+            self.assertIsNone(discrete_log(gamma, beta, m))
+            self.assertEqual(discrete_log(gamma, modular_exp(gamma, 700, m), m), 700)
+
+
+    def test_pollard_rho_log(self):
+        test_cases = ((2, 3, 11, 23),
+                      (64, 9, 166667, 1000003),
+                      (64, 35, 101, 607))
+        for gamma, x, q, m in test_cases:
+            with self.subTest(gamma=gamma, x=x, q=q, m=m):
+                self.assertEqual(_pollard_rho_log(gamma, modular_exp(gamma, x, m), q, m), x)
+
+
+
+class TestDivisors(unittest.TestCase):
+    def test_divisors(self):
+        test_cases = [(1, [1]),
+                      (7, [1, 7]),
+                      (12, [1, 2, 3, 4, 6, 12]),
+                      (64, [1, 2, 4, 8, 16, 32, 64]),
+                      (90, [1, 2, 3, 5, 6, 9, 10, 15, 18, 30, 45, 90]),
+                      (1323, [1, 3, 7, 9, 21, 27, 49, 63, 147, 189, 441, 1323])]
+        for n, ex in test_cases:
+            with self.subTest(n=n, ex=ex):
+                self.assertEqual(list(divisors(n)), ex)
+                self.assertEqual(sorted(divisors(n, False)), ex)
+                self.assertEqual(list(divisors(n, factors=factor_integer(n))), ex)
+
+
+    def test_divisor_functions(self):
+        test_cases = [(1, 1, 1, 1),
+                      (12, 6, 28, 210),
+                      (64, 7, 127, 5461),
+                      (97, 2, 98, 9410),
+                      (720720, 240, 3249792, 836657822000)]
+        for n, count, sigma, sigma2 in test_cases:
+            with self.subTest(n=n):
+                factors = factor_integer(n)
+                self.assertEqual(divisor_count(n), count)
+                self.assertEqual(divisor_count(n, factors), count)
+                self.assertEqual(divisor_sigma(n, 0), count)
+                self.assertEqual(divisor_sigma(n), sigma)
+                self.assertEqual(divisor_sigma(n, 2, factors), sigma2)
+                self.assertEqual(sum_over_divisors(n, lambda d: d*d), sigma2)
+
+
+    def test_dirichlet_product(self):
+        h = dirichlet_product(mobius, lambda n: n)
+        for n in (1, 2, 12, 97, 360):
+            with self.subTest(n=n):
+                self.assertEqual(h(n), totient(n))
+
+
+
 class TestFactorInteger(unittest.TestCase):
     def test_factor_integer(self):
         test_cases = [(1, {}),
@@ -64,6 +179,30 @@ class TestGCD(unittest.TestCase):
                 self.assertEqual(gcd(i), ex)
 
 
+    def test_gcd_array(self):
+        a = (15, 24, 0, 3, 0, 13, 987654321, 2**64 - 1)
+        b = (81, 84, 0, 0, 3, 1, 123456789, 2**63 - 1)
+        ex = [3, 12, 0, 3, 3, 1, 9, 1]
+        self.assertEqual(gcd_array(a, b), ex)
+        self.assertEqual(gcd_array(a + (2**64,), b + (2**65,)), ex + [2**64])
+        with mock.patch('dietnt.numpy', None):
+            self.assertEqual(gcd_array(a, b), ex)
+        with self.assertRaises(ValueError):
+            gcd_array(a, b[:-1])
+
+
+    @unittest.skipIf(numpy is None, 'requires NumPy')
+    def test_gcd_array_2d(self):
+        a = numpy.array([[4, 6], [9, 12]])
+        b = numpy.array([[2, 4], [3, 8]])
+        self.assertEqual(gcd_array(a, b), [[2, 2], [3, 4]])
+        self.assertEqual(gcd_array(a.astype(object) * 2**64, b), [[2, 4], [3, 8]])
+        self.assertEqual(gcd_array([[4, 6]], [[2, 4]]), [[2, 2]])
+        self.assertEqual(gcd_array([[2**64, 6]], [[2, 4]]), [[2, 2]])
+        with self.assertRaises(ValueError):
+            gcd_array(a, b.reshape(1, 4))
+
+
     def test_extended_gcd(self):
         test_cases = [((7,), 7),
                       ((15, 81), 3),
@@ -139,6 +278,26 @@ class TestInverseMod(unittest.TestCase):
                 self.assertEqual(inverse_mod(a,m), e)
 
 
+    def test_inverse_mod_array(self):
+        test_cases = (((13, 30, 0, 1, 17), 17, [4, 4, None, 1, None]),
+                      ((14, 12, 22, 99), 98, [None, None, None, 1]),
+                      ((3, 5), 1, [0, 0]),
+                      ((7, 2**70 + 1), 2**64 + 1, [inverse_mod(7, 2**64 + 1), inverse_mod(2**70 + 1, 2**64 + 1)]))
+        for a, m, ex in test_cases:
+            with self.subTest(a=a, m=m, ex=ex):
+                self.assertEqual(inverse_mod_array(a, m), ex)
+                with mock.patch('dietnt.numpy', None):
+                    self.assertEqual(inverse_mod_array(a, m), ex)
+
+
+    @unittest.skipIf(numpy is None, 'requires NumPy')
+    def test_inverse_mod_array_2d(self):
+        a = numpy.array([[4, 6], [9, 12]])
+        self.assertEqual(inverse_mod_array(a, 7), [[2, 6], [4, 3]])
+        self.assertEqual(inverse_mod_array(a, 2**70 + 1), [[inverse_mod(int(i), 2**70 + 1) for i in row] for row in a])
+        self.assertEqual(inverse_mod_array([[4, 2**64]], 7), [[2, 4]])
+
+
 class TestIsPrime(unittest.TestCase):
     def test_is_prime_list(self):
         for i in primes_to_1000:
@@ -146,6 +305,20 @@ class TestIsPrime(unittest.TestCase):
                 self.assertTrue(is_prime(i))
 
 
+    def test_is_prime_array(self):
+        n = list(range(1000)) + [25326001, 3215031751, 4294967291, 4294967295]
+        ex = [is_prime(i) for i in n]
+        self.assertEqual(is_prime_array(n), ex)
+        with mock.patch('dietnt.numpy', None):
+            self.assertEqual(is_prime_array(n), ex)
+
+
+    @unittest.skipIf(numpy is None, 'requires NumPy')
+    def test_is_prime_array_2d(self):
+        self.assertEqual(is_prime_array(numpy.array([[2, 4], [3, 8]])), [[True, False], [True, False]])
+        self.assertEqual(is_prime_array([[2, 4], [2**32 + 15, 8]]), [[True, False], [True, False]])
+
+
 
 class TestLinearCongruenceSolve(unittest.TestCase):
     def test_linear_congruence_solve(self):
@@ -198,6 +371,24 @@ class TestMobius(unittest.TestCase):
                 self.assertEqual(mobius(n), ex)
 
 
+    def test_mertens(self):
+        test_cases = [(0, 0),
+                      (1, 1),
+                      (10, -1),
+                      (100, 1),
+                      (1000, 2),
+                      (10**6, 212),
+                      (10**7, 1037)]
+        for n, ex in test_cases:
+            with self.subTest(n=n, ex=ex):
+                self.assertEqual(mertens(n), ex)
+        total = 0
+        for n in range(1, 500):
+            total += mobius(n)
+            with self.subTest(n=n):
+                self.assertEqual(mertens(n), total)
+
+
 
 class TestModularExponentiation(unittest.TestCase):
     def test_modular_exp(self):
@@ -234,6 +425,93 @@ class TestModularExponentiation(unittest.TestCase):
                 self.assertEqual(s, ex)
 
 
+    def test_powmod_array(self):
+        test_cases = (((2, 2, 7651, 7651, 5), (644, 32, 891, 3628800, 0), 645),
+                      ((2, 3, 7651, 2**64 - 1), (2**63, 10, 2**64 - 1, 5), 4294967291),
+                      ((9, 9, 7), (-1, -3, 5), 101),
+                      ((2, 3), (10, 20), 2**61 - 1),
+                      ((4, 5), (3, 2), 1))
+        for bases, exps, m in test_cases:
+            with self.subTest(bases=bases, exps=exps, m=m):
+                ex = [modular_exp(b, n, m) for b, n in zip(bases, exps)]
+                self.assertEqual(powmod_array(bases, exps, m), ex)
+                with mock.patch('dietnt.numpy', None):
+                    self.assertEqual(powmod_array(bases, exps, m), ex)
+
+
+    @unittest.skipIf(numpy is None, 'requires NumPy')
+    def test_powmod_array_2d(self):
+        a = numpy.array([[4, 6], [9, 12]])
+        b = numpy.array([[2, 4], [3, 8]])
+        self.assertEqual(powmod_array(a, b, 13), [[3, 9], [1, 1]])
+        self.assertEqual(powmod_array(a, b, 2**61 - 1), [[16, 1296], [729, 429981696]])
+        with self.assertRaises(ValueError):
+            powmod_array(a, b.reshape(4, 1), 13)
+
+
+
+class TestMultiplicativeOrder(unittest.TestCase):
+    def test_multiplicative_order(self):
+        test_cases = [(1, 1, 1),
+                      (2, 7, 3),
+                      (3, 7, 6),
+                      (2, 15, 4),
+                      (6, 15, None),
+                      (10, 13, 6),
+                      (-1, 1000000007, 2),
+                      (5, 2**20, 2**18),
+                      (4, 1000003, 500001)]
+        for a, m, ex in test_cases:
+            with self.subTest(a=a, m=m, ex=ex):
+                self.assertEqual(multiplicative_order(a, m), ex)
+
+
+    def test_carmichael(self):
+        test_cases = [(1, 1),
+                      (2, 1),
+                      (4, 2),
+                      (8, 2),
+                      (16, 4),
+                      (15, 4),
+                      (561, 80),
+                      (1000003, 1000002),
+                      (2**20 * 3**5, 2**18 * 81)]
+        for m, ex in test_cases:
+            with self.subTest(m=m, ex=ex):
+                self.assertEqual(carmichael(m), ex)
+
+
+    def test_primitive_root(self):
+        test_cases = [(1, 1),
+                      (2, 1),
+                      (4, 3),
+                      (8, None),
+                      (15, None),
+                      (18, 5),
+                      (41, 6),
+                      (1323, None),
+                      (6125, None),
+                      (2*3**7, 5),
+                      (1000000007, 5)]
+        for m, ex in test_cases:
+            with self.subTest(m=m, ex=ex):
+                self.assertEqual(primitive_root(m), ex)
+
+
+    def test_is_primitive_root(self):
+        test_cases = [(3, 7, True),
+                      (2, 7, False),
+                      (6, 41, True),
+                      (7, 41, True),
+                      (8, 41, False),
+                      (3, 8, False),
+                      (9, 18, False),
+                      (11, 18, True)]
+        for g, m, ex in test_cases:
+            with self.subTest(g=g, m=m, ex=ex):
+                self.assertEqual(is_primitive_root(g, m), ex)
+
+
 
 class TestPolynomial(unittest.TestCase):
     def test_poly_call(self):
@@ -315,6 +593,65 @@ class TestPolynomialCongruenceSolve(unittest.TestCase):
 
 
 
+class TestProfile(unittest.TestCase):
+    def test_profile_counters(self):
+        with profile() as p:
+            factor_integer(999966000289)
+            is_prime(35)
+            is_prime(4)
+            is_prime(9)
+            poly_congruence_solve(Polynomial((-649,-42,0,0,0,0,0,13)), 1323)
+        self.assertEqual(p.counters['factor_integer.divisions'], 333997 + 14)
+        self.assertEqual(p.counters['is_prime.divisions'], 3 + 1 + 2)
+        self.assertEqual(p.counters['poly_congruence.candidates'], 10)
+        self.assertEqual(p.counters['poly_congruence.lifts'], 3)
+        self.assertEqual(p.counters['poly_congruence.hensel_branches'], 1)
+        self.assertEqual(p.counters['poly_congruence.crt_reconstructions'], 7)
+        for stage in ('factor', 'brute', 'hensel', 'crt'):
+            with self.subTest(stage=stage):
+                self.assertGreaterEqual(p.timers['poly_congruence.' + stage], 0)
+
+
+    def test_profile_nesting(self):
+        m = 1000000009
+        with profile() as outer:
+            multiplicative_order(2, m)
+            with profile() as inner:
+                multiplicative_order(3, m)
+                factor_integer(12)
+        self.assertEqual(inner.caches['_unit_group'], (1, 0))
+        self.assertEqual(inner.counters, {'factor_integer.divisions': 2})
+        self.assertEqual(outer.caches['_unit_group'], (1, 1))
+        self.assertGreater(outer.counters['factor_integer.divisions'], 2)
+
+
+    def test_profile_threads(self):
+        barrier = threading.Barrier(2)
+        profiles = {}
+        def work(n):
+            with profile() as p:
+                barrier.wait()
+                factor_integer(n)
+                barrier.wait()
+            profiles[n] = p
+        threads = [threading.Thread(target=work, args=(n,)) for n in (12, 35)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(profiles[12].counters, {'factor_integer.divisions': 2})
+        self.assertEqual(profiles[35].counters, {'factor_integer.divisions': 3 + 2 + 2})
+
+
+    def test_profile_off(self):
+        with profile() as p:
+            pass
+        factor_integer(30)
+        self.assertEqual(p.counters, {})
+        self.assertEqual(p.timers, {})
+
+
+
 class TestSieve(unittest.TestCase):
     def test_sieve(self):
         test_cases = [(2, []),
@@ -338,5 +675,22 @@ class TestTotient(unittest.TestCase):
                 self.assertEqual(totient(n), ex)
 
 
+    def test_totient_sum(self):
+        test_cases = [(0, 0),
+                      (1, 1),
+                      (10, 32),
+                      (100, 3044),
+                      (10**6, 303963552392),
+                      (10**7, 30396356427242)]
+        for n, ex in test_cases:
+            with self.subTest(n=n, ex=ex):
+                self.assertEqual(totient_sum(n), ex)
+        total = 0
+        for n in range(1, 500):
+            total += totient(n)
+            with self.subTest(n=n):
+                self.assertEqual(totient_sum(n), total)
+
+
 if __name__ == '__main__':
     unittest.main()